@@ -0,0 +1,149 @@
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator
+import numpy as np
+import pandas as pd
+from sqlalchemy import Column, MetaData, Table, insert
+from sqlalchemy.dialects import postgresql
+from factPlayerGameStatistics import INT_STAT_COLUMNS, PCT_STAT_COLUMNS, SURROGATE_KEY_COLUMNS, build_fact_columns, fill_statistics
+from utils.save_to_postgres import serialize_binary_batches
+
+
+def generate_games_details(rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a synthetic games_details DataFrame after the mapping step of factETL
+
+    Args:
+        rows: Number of player game statistics records
+        seed: Random seed
+
+    Returns:
+        DataFrame with surrogate keys, minutes and raw statistics (about 5% missing)
+    """
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({column: rng.integers(1, 1000, rows).astype(float) for column in SURROGATE_KEY_COLUMNS})
+    df['START_POSITION'] = rng.choice(np.array(['F', 'C', 'G', None], dtype=object), rows)
+    df['minutes_decimal'] = rng.integers(0, 48, rows)
+    for column in INT_STAT_COLUMNS:
+        values = rng.integers(0, 30, rows).astype(float)
+        values[rng.random(rows) < 0.05] = np.nan
+        df[column] = values
+    for column in PCT_STAT_COLUMNS:
+        values = rng.random(rows)
+        values[rng.random(rows) < 0.05] = np.nan
+        df[column] = values
+    return df
+
+
+def legacy_write(df: pd.DataFrame, batch_size: int) -> Iterator[None]:
+    """
+    Previous write path up to the database driver
+
+    Builds the fact DataFrame with per-column fillna/astype, copies a DataFrame
+    per batch and, like to_sql(method='multi'), turns it into a multi-row INSERT
+    compiled for PostgreSQL. Only sending the statement is left out.
+    """
+    fact_df = pd.DataFrame({
+        **{column: df[source].astype(int) for source, column in SURROGATE_KEY_COLUMNS.items()},
+        'start_position': df['START_POSITION'].fillna(''),
+        'minutes_played': df['minutes_decimal'],
+        **{column: df[source].fillna(0).astype(int) for source, column in INT_STAT_COLUMNS.items()},
+        **{column: df[source].fillna(0.0) for source, column in PCT_STAT_COLUMNS.items()}
+    })
+    fact_df['id'] = fact_df.reset_index().index + 1
+    fact_df.reset_index(drop=True, inplace=True)
+    table = Table('fact_player_game_statistics', MetaData(), *(Column(name) for name in fact_df.columns))
+    dialect = postgresql.psycopg2.dialect()
+    yield
+
+    for i in range(0, len(fact_df), batch_size):
+        batch_end = min(i + batch_size, len(fact_df))
+        batch_df = fact_df.iloc[i:batch_end].copy()
+        batch_df['id'] = range(i + 1, batch_end + 1)
+        data = [dict(zip(batch_df.columns, row)) for row in batch_df.itertuples(index=False, name=None)]
+        insert(table).values(data).compile(dialect=dialect).construct_params()
+        del batch_df, data
+        yield
+
+
+def copy_write(df: pd.DataFrame, batch_size: int) -> Iterator[None]:
+    """Current write path up to the database driver: statistics filled once, column slices serialized for binary COPY"""
+    int_stats, pct_stats = fill_statistics(df)
+    fact_columns = build_fact_columns(df, int_stats, pct_stats)
+    batches = serialize_binary_batches(fact_columns, batch_size)
+    yield
+
+    for _ in batches:
+        yield
+
+
+def measure(write: Callable[[pd.DataFrame, int], Iterator[None]], df: pd.DataFrame, batch_size: int) -> Dict[str, float]:
+    """
+    Run a write path and measure its speed, memory usage and per-batch allocation churn
+
+    Write paths yield once after their setup and once after each batch. The
+    churn of a batch is how far traced memory rose above its level before the
+    batch, i.e. the bytes allocated (and usually freed) while serializing it.
+
+    Args:
+        write: Write path to benchmark
+        df: Input DataFrame (each run gets a copy so runs do not affect each other)
+        batch_size: Number of rows per batch
+
+    Returns:
+        Dictionary with elapsed seconds, rows per second, peak and retained traced
+        memory in MB, and total and per-batch allocation churn in MB
+    """
+    # Time and memory are measured in separate runs, since tracing slows allocations down
+    data = df.copy()
+    start = time.perf_counter()
+    for _ in write(data, batch_size):
+        pass
+    elapsed = time.perf_counter() - start
+
+    data = df.copy()
+    tracemalloc.start()
+    steps = write(data, batch_size)
+    next(steps)
+    churn, batches = 0, 0
+    baseline, peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    for _ in steps:
+        current, batch_peak = tracemalloc.get_traced_memory()
+        churn += batch_peak - baseline
+        batches += 1
+        peak = max(peak, batch_peak)
+        baseline = current
+        tracemalloc.reset_peak()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'seconds': elapsed,
+        'rows_per_second': len(df) / elapsed,
+        'peak_mb': peak / 2 ** 20,
+        'retained_mb': retained / 2 ** 20,
+        'churn_mb': churn / 2 ** 20,
+        'churn_per_batch_mb': churn / max(batches, 1) / 2 ** 20
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fact table write path up to the database driver, without a database")
+    parser.add_argument('--rows', type=int, default=50000, help="Number of synthetic records")
+    parser.add_argument('--batch-size', type=int, default=10000, help="Records per batch")
+    args = parser.parse_args()
+
+    df = generate_games_details(args.rows)
+    print(f"Fact write benchmark: {args.rows} rows, batches of {args.batch_size} (statement building only, nothing sent)")
+    for name, write in [('legacy', legacy_write), ('copy', copy_write)]:
+        result = measure(write, df, args.batch_size)
+        print(
+            f"{name:>7}: {result['seconds']:.2f}s, {result['rows_per_second']:,.0f} rows/s, "
+            f"peak {result['peak_mb']:.1f} MB, retained {result['retained_mb']:.1f} MB, "
+            f"batch churn {result['churn_mb']:.1f} MB ({result['churn_per_batch_mb']:.2f} MB/batch)"
+        )
+
+
+if __name__ == "__main__":
+    main()
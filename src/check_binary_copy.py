@@ -0,0 +1,100 @@
+import struct
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from utils.save_to_postgres import PGCOPY_HEADER, PGCOPY_TRAILER, binary_column_order, serialize_binary_batches
+
+
+def decode_binary_batch(data: bytes, names: List[str], types: Dict[str, str]) -> List[Dict]:
+    """
+    Decode one PostgreSQL binary COPY batch
+
+    Args:
+        data: Bytes of the batch
+        names: Column names in field order
+        types: Struct format of each column ('>i', '>d', '?'), 'text' for text columns
+
+    Returns:
+        List of rows as {column name: value}, None for NULL
+    """
+    assert data[:len(PGCOPY_HEADER)] == PGCOPY_HEADER, "bad header"
+    assert data[-len(PGCOPY_TRAILER):] == PGCOPY_TRAILER, "bad trailer"
+    position = len(PGCOPY_HEADER)
+    rows = []
+    while position < len(data) - len(PGCOPY_TRAILER):
+        (field_count,) = struct.unpack_from('>h', data, position)
+        assert field_count == len(names), f"row has {field_count} fields instead of {len(names)}"
+        position += 2
+        row = {}
+        for name in names:
+            (length,) = struct.unpack_from('>i', data, position)
+            position += 4
+            if length == -1:
+                row[name] = None
+                continue
+            raw = data[position:position + length]
+            position += length
+            row[name] = raw.decode() if types[name] == 'text' else struct.unpack(types[name], raw)[0]
+        rows.append(row)
+    assert position == len(data) - len(PGCOPY_TRAILER), "trailing bytes after the last row"
+    return rows
+
+
+def check_round_trip(columns: Dict[str, np.ndarray], batch_size: int) -> None:
+    """
+    Serialize columns, decode every batch and compare with the input
+
+    Args:
+        columns: Dictionary mapping column names to equally sized arrays, including an 'id' column
+        batch_size: Number of rows per batch
+    """
+    names = binary_column_order(columns)
+    types = {}
+    for name in names:
+        kind = columns[name].dtype.kind
+        types[name] = '?' if kind == 'b' else '>i' if kind in 'iu' else '>d' if kind == 'f' else 'text'
+
+    decoded = []
+    for batch_number, batch in enumerate(serialize_binary_batches(columns, batch_size)):
+        rows = decode_binary_batch(bytes(batch), names, types)
+        batch_ids = sorted(row['id'] for row in rows)
+        expected_ids = columns['id'][batch_number * batch_size:(batch_number + 1) * batch_size].tolist()
+        assert batch_ids == sorted(expected_ids), f"batch {batch_number} holds the wrong rows"
+        decoded += rows
+
+    got = pd.DataFrame(decoded, columns=names).sort_values('id').reset_index(drop=True)
+    assert len(got) == len(columns['id']), "row count differs"
+    for name in names:
+        assert got[name].tolist() == columns[name].tolist(), f"column {name} differs"
+
+
+def main():
+    rng = np.random.default_rng(0)
+    rows = 2503
+    columns = {
+        'id': np.arange(1, rows + 1),
+        'count': rng.integers(-2 ** 31, 2 ** 31 - 1, rows),
+        'small': rng.integers(0, 100, rows).astype(np.int16),
+        'average': rng.random(rows),
+        'flag': rng.random(rows) < 0.5,
+        'position': rng.choice(np.array(['F', 'C', 'G', '', None], dtype=object), rows),
+        'name': rng.choice(np.array(['Nikola Jokić', 'Luka Dončić', 'Ja Morant', None], dtype=object), rows)
+    }
+
+    # Several text groups, a single group per batch, no text column and one row per batch
+    check_round_trip(columns, 1000)
+    check_round_trip({'id': columns['id'], 'position': np.full(rows, 'G', dtype=object)}, 1000)
+    check_round_trip({name: columns[name] for name in ['id', 'count', 'average', 'flag']}, 1000)
+    check_round_trip({name: values[:5] for name, values in columns.items()}, 1)
+
+    try:
+        next(serialize_binary_batches({'id': np.array([1, 2 ** 31 + 5])}))
+        raise AssertionError("out of range int4 value was serialized")
+    except ValueError:
+        pass
+
+    print("Binary COPY round trip OK")
+
+
+if __name__ == "__main__":
+    main()
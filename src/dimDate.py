@@ -2,7 +2,7 @@ import pandas as pd
 import holidays
 from datetime import date
 from typing import Dict
-from utils.save_to_postgres import save_to_postgres
+from utils.run_state import compute_fingerprint, get_unchanged_state, replace_stage_output
 import logging
 
 def generate_date_dimension(start_date: date, end_date: date) -> pd.DataFrame:
@@ -65,15 +65,17 @@ def dimensionDateCreation(config: Dict[str, str]) -> Dict[date, int]:
         # Generate dimension
         date_df = generate_date_dimension(start_date, end_date)
         
-        # Save to database
-        save_to_postgres(
-            df=date_df,
-            table_name='dim_date',
-            config=config,
-        )
-        
         # Create mapping dictionary
         date_mapping = dict(zip(date_df['date'], date_df['id']))
+
+        # The dimension is generated, so only save it when the generated rows changed
+        input_fingerprint = compute_fingerprint(date_df)
+        if get_unchanged_state(config, 'dim_date', input_fingerprint) is not None:
+            logging.info("Stage dim_date unchanged, skipping save")
+            return date_mapping
+        
+        # Save to database, replacing the previous run
+        replace_stage_output(config, 'dim_date', input_fingerprint, date_df)
         
         return date_mapping
     
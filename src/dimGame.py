@@ -1,7 +1,7 @@
 from typing import Dict
 import pandas as pd
 from utils.read_csv import read_csv_file
-from utils.save_to_postgres import save_to_postgres
+from utils.run_state import compute_fingerprint, get_output_fingerprints, load_unchanged_mapping, replace_stage_output
 import logging
 
 def dimensionGameETL(config: Dict[str, str], team_mapping: Dict[int, int]) -> Dict[int, int]:
@@ -37,6 +37,21 @@ def dimensionGameETL(config: Dict[str, str], team_mapping: Dict[int, int]) -> Di
             'HOME_TEAM_WINS': bool
         })
 
+        # Pula a etapa se nem os jogos nem a dimensão Team mudaram
+        input_fingerprint = compute_fingerprint(
+            df,
+            ['GAME_ID', 'SEASON', 'HOME_TEAM_ID', 'VISITOR_TEAM_ID', 'PTS_home', 'FG_PCT_home', 'FT_PCT_home',
+             'FG3_PCT_home', 'AST_home', 'REB_home', 'PTS_away', 'FG_PCT_away', 'FT_PCT_away', 'FG3_PCT_away',
+             'AST_away', 'REB_away', 'HOME_TEAM_WINS'],
+            upstream=get_output_fingerprints(config, ['dim_team'])
+        )
+        game_mapping = load_unchanged_mapping(
+            config, 'dim_game', input_fingerprint,
+            "SELECT game_id, id FROM dim_game ORDER BY id"
+        )
+        if game_mapping is not None:
+            return game_mapping
+
         # Mapeia os IDs dos times
         df["home_team_id"] = df["HOME_TEAM_ID"].map(team_mapping)
         df["visitor_team_id"] = df["VISITOR_TEAM_ID"].map(team_mapping)
@@ -71,17 +86,13 @@ def dimensionGameETL(config: Dict[str, str], team_mapping: Dict[int, int]) -> Di
         # Cria surrogate key
         df_save["id"] = df_save.reset_index().index + 1
 
-        # Salva no banco
-        save_to_postgres(
-            df=df_save,
-            table_name='dim_game',
-            config=config,
-        )
-
         logging.info(f"Successfully processed {len(df_save)} games")
 
         # Retorna mapeamento GAME_ID → surrogate id
-        return dict(zip(df_save["game_id"], df_save["id"]))
+        game_mapping = dict(zip(df_save["game_id"], df_save["id"]))
+        # Salva no banco, substituindo a execução anterior
+        replace_stage_output(config, 'dim_game', input_fingerprint, df_save, game_mapping)
+        return game_mapping
 
     except Exception as e:
         logging.error(f"Error in game dimension ETL: {str(e)}")
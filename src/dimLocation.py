@@ -1,7 +1,7 @@
 from typing import Dict
 import pandas as pd
 from utils.read_csv import read_csv_file
-from utils.save_to_postgres import save_to_postgres
+from utils.run_state import compute_fingerprint, load_unchanged_mapping, replace_stage_output
 import logging
 
 def dimensionLocationETL(config: Dict[str, str]) -> Dict[str, int]:
@@ -23,6 +23,16 @@ def dimensionLocationETL(config: Dict[str, str]) -> Dict[str, int]:
             'ARENACAPACITY': float
         })
 
+        # Skip the stage when the location columns did not change since the last run
+        input_fingerprint = compute_fingerprint(df, ['CITY', 'ARENA', 'ARENACAPACITY'])
+        location_mapping = load_unchanged_mapping(
+            config, 'dim_location', input_fingerprint,
+            # A fresh run builds keys from NaN for missing values, which formats as 'nan'
+            "SELECT COALESCE(city, 'nan') || '|' || COALESCE(arena, 'nan'), id FROM dim_location ORDER BY id"
+        )
+        if location_mapping is not None:
+            return location_mapping
+
         # Handle missing arena capacity values
         df["ARENACAPACITY"] = df["ARENACAPACITY"].fillna(-1).astype(int)
 
@@ -41,13 +51,6 @@ def dimensionLocationETL(config: Dict[str, str]) -> Dict[str, int]:
         df_save['id'] = df_save.reset_index().index + 1
         df_save.reset_index(drop=True, inplace=True)
 
-        # Save to PostgreSQL
-        save_to_postgres(
-            df=df_save,
-            table_name='dim_location',
-            config=config,
-        )
-
         logging.info(f"Successfully processed {len(df_save)} locations")
 
         # Return mapping {city + arena -> id}
@@ -56,6 +59,9 @@ def dimensionLocationETL(config: Dict[str, str]) -> Dict[str, int]:
         for _, row in df_save.iterrows():
             key = f"{row['city']}|{row['arena']}"
             location_mapping[key] = row['id']
+
+        # Save to PostgreSQL, replacing the previous run
+        replace_stage_output(config, 'dim_location', input_fingerprint, df_save, location_mapping)
         
         return location_mapping
 
@@ -1,7 +1,7 @@
 from typing import Dict
 import pandas as pd
 from utils.read_csv import read_csv_file
-from utils.save_to_postgres import save_to_postgres
+from utils.run_state import compute_fingerprint, load_unchanged_mapping, replace_stage_output
 import logging
 
 def dimensionPlayerETL(config:  Dict[str, str]) -> Dict[int, int]:
@@ -23,6 +23,15 @@ def dimensionPlayerETL(config:  Dict[str, str]) -> Dict[int, int]:
             'SEASON': int,
         })
 
+        # Skip the stage when the player columns did not change since the last run
+        input_fingerprint = compute_fingerprint(df, ['PLAYER_ID', 'PLAYER_NAME'])
+        player_mapping = load_unchanged_mapping(
+            config, 'dim_player', input_fingerprint,
+            "SELECT player_id, id FROM dim_player ORDER BY id"
+        )
+        if player_mapping is not None:
+            return player_mapping
+
         # Create DataFrame for saving with required columns
         df_save = pd.DataFrame({
             "player_id": df['PLAYER_ID'],
@@ -32,17 +41,12 @@ def dimensionPlayerETL(config:  Dict[str, str]) -> Dict[int, int]:
         # Add surrogate key
         df_save['id'] = df_save.reset_index().index + 1
 
-        # Save to database
-        save_to_postgres(
-            df=df_save,
-            table_name='dim_player',
-            config=config,
-        )
-
         logging.info(f"Successfully processed {len(df_save)} players")
         
         # Create and return mapping dictionary {original_id: surrogate_key}
         player_mapping = dict(zip(df_save['player_id'], df_save['id']))
+        # Save to database, replacing the previous run
+        replace_stage_output(config, 'dim_player', input_fingerprint, df_save, player_mapping)
         return player_mapping
 
     except Exception as e:
@@ -1,7 +1,7 @@
 from typing import Dict
 import pandas as pd
 from utils.read_csv import read_csv_file
-from utils.save_to_postgres import save_to_postgres
+from utils.run_state import compute_fingerprint, get_output_fingerprints, load_unchanged_mapping, replace_stage_output
 import logging
 
 def dimensionTeamETL(config: Dict[str, str], location_mapping: Dict[str, int]) -> Dict[int, int]:
@@ -33,6 +33,20 @@ def dimensionTeamETL(config: Dict[str, str], location_mapping: Dict[str, int]) -
             'DLEAGUEAFFILIATION': str
         })
 
+        # Skip the stage when neither the team columns nor the location dimension changed
+        input_fingerprint = compute_fingerprint(
+            df,
+            ['TEAM_ID', 'MIN_YEAR', 'MAX_YEAR', 'ABBREVIATION', 'NICKNAME', 'YEARFOUNDED', 'CITY', 'ARENA',
+             'OWNER', 'GENERALMANAGER', 'HEADCOACH', 'DLEAGUEAFFILIATION'],
+            upstream=get_output_fingerprints(config, ['dim_location'])
+        )
+        team_mapping = load_unchanged_mapping(
+            config, 'dim_team', input_fingerprint,
+            "SELECT team_id, id FROM dim_team ORDER BY id"
+        )
+        if team_mapping is not None:
+            return team_mapping
+
         df["ARENACAPACITY"] = df["ARENACAPACITY"].fillna(-1).astype(int)
 
         # Map location to location dimension surrogate key
@@ -57,17 +71,12 @@ def dimensionTeamETL(config: Dict[str, str], location_mapping: Dict[str, int]) -
         # Add surrogate key (id)
         df_save['id'] = df_save.reset_index().index + 1
 
-        # Save to PostgreSQL
-        save_to_postgres(
-            df=df_save,
-            table_name='dim_team',
-            config=config,
-        )
-
         logging.info(f"Successfully processed {len(df_save)} teams")
 
         # Return mapping {team_id original -> id substituta}
         team_mapping = dict(zip(df_save['team_id'], df_save['id']))
+        # Save to PostgreSQL, replacing the previous run
+        replace_stage_output(config, 'dim_team', input_fingerprint, df_save, team_mapping)
         return team_mapping
 
     except Exception as e:
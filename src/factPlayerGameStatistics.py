@@ -1,10 +1,100 @@
 from datetime import date
-from typing import Dict
+from typing import Dict, Tuple
+import numpy as np
 import pandas as pd
 from utils.read_csv import read_csv_file
-from utils.save_to_postgres import save_to_postgres
+from utils.run_state import compute_fingerprint, get_output_fingerprints, get_unchanged_state, replace_stage_output
 import logging
 
+# Counting statistics, stored as int in the fact table
+INT_STAT_COLUMNS = {
+    'FGM': 'field_goals_made',
+    'FGA': 'field_goals_attempt',
+    'FG3M': 'three_points_made',
+    'FG3A': 'three_goals_attempt',
+    'FTM': 'free_throws_made',
+    'FTA': 'free_throws_attempt',
+    'REB': 'rebounds',
+    'DREB': 'defensive_rebounds',
+    'AST': 'assists',
+    'STL': 'steals',
+    'BLK': 'blocked_shots',
+    'TO': 'turn_over',
+    'PF': 'personal_foul',
+    'PTS': 'points_scored',
+    'PLUS_MINUS': 'plus_minus'
+}
+
+# Shooting percentages, stored as float in the fact table
+PCT_STAT_COLUMNS = {
+    'FG_PCT': 'field_goals_average',
+    'FG3_PCT': 'three_goals_average',
+    'FT_PCT': 'free_throws_average'
+}
+
+SURROGATE_KEY_COLUMNS = {
+    'game_surrogate_id': 'game_id',
+    'player_surrogate_id': 'player_id',
+    'date_surrogate_id': 'date_id',
+    'team_surrogate_id': 'team_id',
+    'location_surrogate_id': 'location_id'
+}
+
+
+def fill_statistics(df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Fill missing statistics with zero and cast the counting statistics to int
+    
+    All statistics are copied once into a single float block whose NaN are
+    filled in place, then the counting statistics are cast to int in one pass.
+    Infinite counting statistics raise, as fillna(0).astype(int) did.
+    
+    Args:
+        df: Raw games_details DataFrame
+        
+    Returns:
+        Tuple with the int counting statistics and the float percentages, one column per statistic
+    """
+    stats = df[list(INT_STAT_COLUMNS) + list(PCT_STAT_COLUMNS)].to_numpy(dtype=np.float64)
+    stats[np.isnan(stats)] = 0
+    counts = stats[:, :len(INT_STAT_COLUMNS)]
+    if not np.isfinite(counts).all():
+        raise ValueError("Cannot convert non-finite values (inf) to integer")
+    int_stats = counts.astype(np.int64, order='F')
+    pct_stats = stats[:, len(INT_STAT_COLUMNS):]
+    return int_stats, pct_stats
+
+
+def build_fact_columns(df: pd.DataFrame, int_stats: np.ndarray, pct_stats: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Build the fact table column arrays, dropping rows with missing mappings
+    
+    Args:
+        df: games_details DataFrame with surrogate key and minutes columns
+        int_stats: Counting statistics returned by fill_statistics
+        pct_stats: Percentages returned by fill_statistics
+        
+    Returns:
+        Dictionary mapping fact table column names to arrays
+    """
+    keep = df[list(SURROGATE_KEY_COLUMNS)].notna().all(axis=1).to_numpy()
+    drop_rows = not keep.all()
+    
+    # Only copy the columns when rows have to be dropped
+    def select(values: np.ndarray) -> np.ndarray:
+        return values[keep] if drop_rows else values
+    
+    fact_columns = {'id': np.arange(1, int(keep.sum()) + 1)}
+    for source, column in SURROGATE_KEY_COLUMNS.items():
+        fact_columns[column] = select(df[source].to_numpy()).astype(np.int64)
+    fact_columns['start_position'] = select(df['START_POSITION'].fillna('').to_numpy(dtype=object))
+    fact_columns['minutes_played'] = select(df['minutes_decimal'].to_numpy(dtype=np.float64))
+    for i, column in enumerate(INT_STAT_COLUMNS.values()):
+        fact_columns[column] = select(int_stats[:, i])
+    for i, column in enumerate(PCT_STAT_COLUMNS.values()):
+        fact_columns[column] = select(pct_stats[:, i])
+    return fact_columns
+
 
 def factETL(config: Dict[str, str], date_mapping: Dict[date, int], player_mapping: Dict[int, int], team_mapping: Dict[int, int], game_mapping: Dict[int, int], location_mapping: Dict[str, int]):
     """
@@ -56,6 +146,37 @@ def factETL(config: Dict[str, str], date_mapping: Dict[date, int], player_mappin
         
         logging.info(f"Loaded {len(df)} player game statistics records")
         
+        # For date mapping, we need to get the game date from the games.csv
+        # First, let's read the games.csv to get the mapping of GAME_ID to GAME_DATE_EST
+        games_df = read_csv_file('../data/games.csv', {
+            'GAME_ID': int,
+            'GAME_DATE_EST': str
+        })
+        
+        # Get location information from teams.csv to map location_id
+        teams_df = read_csv_file('../data/teams.csv', {
+            'TEAM_ID': int,
+            'CITY': str,
+            'ARENA': str
+        })
+        
+        # Skip the stage when neither the columns it uses nor any upstream dimension changed
+        input_fingerprint = compute_fingerprint(
+            df,
+            ['GAME_ID', 'TEAM_ID', 'PLAYER_ID', 'START_POSITION', 'MIN', *INT_STAT_COLUMNS, *PCT_STAT_COLUMNS],
+            upstream=[
+                compute_fingerprint(games_df, ['GAME_ID', 'GAME_DATE_EST']),
+                compute_fingerprint(teams_df, ['TEAM_ID', 'CITY', 'ARENA']),
+                *get_output_fingerprints(config, ['dim_date', 'dim_player', 'dim_team', 'dim_game', 'dim_location'])
+            ]
+        )
+        if get_unchanged_state(config, 'fact_player_game_statistics', input_fingerprint) is not None:
+            logging.info("Stage fact_player_game_statistics unchanged, skipping load")
+            return
+        
+        # Fill and cast the statistics once, before any batching
+        int_stats, pct_stats = fill_statistics(df)
+        
         # Convert minutes from "MM:SS" format to integer minutes
         def convert_minutes(min_str):
             if pd.isna(min_str) or min_str == '':
@@ -73,13 +194,6 @@ def factETL(config: Dict[str, str], date_mapping: Dict[date, int], player_mappin
         df['player_surrogate_id'] = df['PLAYER_ID'].map(player_mapping)
         df['team_surrogate_id'] = df['TEAM_ID'].map(team_mapping)
         
-        # For date mapping, we need to get the game date from the games.csv
-        # First, let's read the games.csv to get the mapping of GAME_ID to GAME_DATE_EST
-        games_df = read_csv_file('../data/games.csv', {
-            'GAME_ID': int,
-            'GAME_DATE_EST': str
-        })
-        
         # Convert game dates to date objects
         games_df['game_date'] = pd.to_datetime(games_df['GAME_DATE_EST']).dt.date
         game_date_mapping = dict(zip(games_df['GAME_ID'], games_df['game_date']))
@@ -88,13 +202,6 @@ def factETL(config: Dict[str, str], date_mapping: Dict[date, int], player_mappin
         df['game_date'] = df['GAME_ID'].map(game_date_mapping)
         df['date_surrogate_id'] = df['game_date'].map(date_mapping)
         
-        # Get location information from teams.csv to map location_id
-        teams_df = read_csv_file('../data/teams.csv', {
-            'TEAM_ID': int,
-            'CITY': str,
-            'ARENA': str
-        })
-        
         # Create team to location mapping
         teams_df['location_key'] = teams_df['CITY'] + '|' + teams_df['ARENA']
         team_location_mapping = dict(zip(teams_df['TEAM_ID'], teams_df['location_key']))
@@ -121,84 +228,25 @@ def factETL(config: Dict[str, str], date_mapping: Dict[date, int], player_mappin
         if missing_locations > 0:
             logging.warning(f"Missing location mappings for {missing_locations} unique teams")
         
-        # Drop rows with missing critical mappings
         initial_count = len(df)
-        df = df.dropna(subset=['game_surrogate_id', 'player_surrogate_id', 'team_surrogate_id', 'date_surrogate_id', 'location_surrogate_id'])
-        final_count = len(df)
-        
-        if initial_count != final_count:
-            logging.warning(f"Dropped {initial_count - final_count} rows due to missing mappings")
-        
-        # Create the fact table DataFrame
-        fact_df = pd.DataFrame({
-            'game_id': df['game_surrogate_id'].astype(int),
-            'player_id': df['player_surrogate_id'].astype(int),
-            'date_id': df['date_surrogate_id'].astype(int),
-            'team_id': df['team_surrogate_id'].astype(int),
-            'location_id': df['location_surrogate_id'].astype(int),
-            'start_position': df['START_POSITION'].fillna(''),
-            'minutes_played': df['minutes_decimal'],
-            
-            # Field goals
-            'field_goals_made': df['FGM'].fillna(0).astype(int),
-            'field_goals_attempt': df['FGA'].fillna(0).astype(int),
-            'field_goals_average': df['FG_PCT'].fillna(0.0),
-            
-            # Three-point shots
-            'three_points_made': df['FG3M'].fillna(0).astype(int),
-            'three_goals_attempt': df['FG3A'].fillna(0).astype(int),
-            'three_goals_average': df['FG3_PCT'].fillna(0.0),
-            
-            # Free throws
-            'free_throws_made': df['FTM'].fillna(0).astype(int),
-            'free_throws_attempt': df['FTA'].fillna(0).astype(int),
-            'free_throws_average': df['FT_PCT'].fillna(0.0),
-            
-            # Rebounds
-            'rebounds': df['REB'].fillna(0).astype(int),
-            'defensive_rebounds': df['DREB'].fillna(0).astype(int),
-            
-            # Other statistics
-            'assists': df['AST'].fillna(0).astype(int),
-            'steals': df['STL'].fillna(0).astype(int),
-            'blocked_shots': df['BLK'].fillna(0).astype(int),
-            'turn_over': df['TO'].fillna(0).astype(int),
-            'personal_foul': df['PF'].fillna(0).astype(int),
-            'points_scored': df['PTS'].fillna(0).astype(int),
-            'plus_minus': df['PLUS_MINUS'].fillna(0).astype(int)
-        })
-        # Add surrogate key
-        fact_df['id'] = fact_df.reset_index().index + 1
-        fact_df.reset_index(drop=True, inplace=True)
+        fact_columns = build_fact_columns(df, int_stats, pct_stats)
+        total_records = len(fact_columns['id'])
+        
+        if initial_count != total_records:
+            logging.warning(f"Dropped {initial_count - total_records} rows due to missing mappings")
         
-        # Process in batches to avoid memory issues
+        # Stream the column arrays to the database in batches, without building a DataFrame per batch
         batch_size = 10000  # Process 10K records at a time
-        total_records = len(fact_df)
         
         logging.info(f"Processing {total_records} records in batches of {batch_size}")
         
-        # Save to database in batches
-        for i in range(0, total_records, batch_size):
-            batch_end = min(i + batch_size, total_records)
-            batch_df = fact_df.iloc[i:batch_end].copy()
-            
-            # Update surrogate keys for this batch to ensure uniqueness
-            batch_df['id'] = range(i + 1, batch_end + 1)
-            
-            logging.info(f"Saving batch {i//batch_size + 1}: records {i+1} to {batch_end}")
-            
-            save_to_postgres(
-                df=batch_df,
-                table_name='fact_player_game_statistics',
-                config=config
-            )
-            
-            # Clear memory
-            del batch_df
-            
-            # Log progress
-            progress = (batch_end / total_records) * 100
-            logging.info(f"Progress: {progress:.1f}% ({batch_end}/{total_records} records)")
+        replace_stage_output(
+            config,
+            'fact_player_game_statistics',
+            input_fingerprint,
+            fact_columns,
+            batch_size=batch_size
+        )
         
         logging.info(f"Successfully processed all {total_records} player game statistics records")
         
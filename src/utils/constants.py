@@ -0,0 +1,16 @@
+# Table that keeps the input/output fingerprints of each ETL stage
+RUN_STATE_TABLE = 'etl_run_state'
+
+# Directory where key mappings of unchanged stages are cached between runs
+MAPPING_CACHE_DIR = '../data/.cache'
+
+# Tables whose rows reference each stage's table through a foreign key.
+# Stages are named after the table they load.
+STAGE_DEPENDENTS = {
+    'dim_location': ['dim_team', 'fact_player_game_statistics'],
+    'dim_team': ['dim_game', 'fact_player_game_statistics'],
+    'dim_player': ['fact_player_game_statistics'],
+    'dim_date': ['fact_player_game_statistics'],
+    'dim_game': ['fact_player_game_statistics'],
+    'fact_player_game_statistics': []
+}
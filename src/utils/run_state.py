@@ -0,0 +1,226 @@
+import hashlib
+import logging
+import os
+import pickle
+from typing import Dict, Iterable, List, Mapping, Optional, Union
+import numpy as np
+import pandas as pd
+from sqlalchemy import bindparam, text
+from utils.constants import RUN_STATE_TABLE, MAPPING_CACHE_DIR, STAGE_DEPENDENTS
+from utils.save_to_postgres import copy_columns, get_engine
+
+def compute_fingerprint(df: Union[pd.DataFrame, Mapping[str, np.ndarray]], columns: List[str] = None, upstream: Iterable[str] = ()) -> str:
+    """
+    Compute a content hash of a DataFrame or of a mapping of column arrays
+
+    Args:
+        df: DataFrame or {column name: array} mapping to fingerprint
+        columns: Columns to include in the hash (all columns when omitted)
+        upstream: Fingerprints of upstream stages the result depends on
+
+    Returns:
+        Hex digest identifying the content of the selected columns
+    """
+    columns = list(df) if columns is None else columns
+    digest = hashlib.sha256()
+    digest.update('|'.join(columns).encode())
+    for column in columns:
+        hashed = pd.util.hash_pandas_object(pd.Series(df[column], copy=False), index=False)
+        digest.update(hashed.values.tobytes())
+    for fingerprint in upstream:
+        digest.update((fingerprint or '').encode())
+    return digest.hexdigest()
+
+def get_run_states(config: Dict[str, str], stages: List[str]) -> Dict[str, Dict[str, str]]:
+    """
+    Read the fingerprints recorded by the last successful run of several stages
+
+    Args:
+        config: Dictionary with database configuration
+        stages: Names of the ETL stages
+
+    Returns:
+        Dictionary mapping each stage that ran to its input_fingerprint and output_fingerprint
+    """
+    engine = get_engine(config)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(
+                text(
+                    f"SELECT stage, input_fingerprint, output_fingerprint FROM {RUN_STATE_TABLE} WHERE stage IN :stages"
+                ).bindparams(bindparam('stages', expanding=True)),
+                {'stages': stages}
+            ).mappings().all()
+    finally:
+        engine.dispose()
+    return {row['stage']: {'input_fingerprint': row['input_fingerprint'], 'output_fingerprint': row['output_fingerprint']} for row in rows}
+
+def get_run_state(config: Dict[str, str], stage: str) -> Optional[Dict[str, str]]:
+    """
+    Read the fingerprints recorded by the last successful run of a stage
+
+    Args:
+        config: Dictionary with database configuration
+        stage: Name of the ETL stage
+
+    Returns:
+        Dictionary with input_fingerprint and output_fingerprint, or None if the stage never ran
+    """
+    return get_run_states(config, [stage]).get(stage)
+
+def get_unchanged_state(config: Dict[str, str], stage: str, input_fingerprint: str) -> Optional[Dict[str, str]]:
+    """
+    Check whether a stage already processed the given input
+
+    Args:
+        config: Dictionary with database configuration
+        stage: Name of the ETL stage
+        input_fingerprint: Fingerprint of the current input of the stage
+
+    Returns:
+        Recorded run state when the input fingerprint matches, None otherwise
+    """
+    state = get_run_state(config, stage)
+    if state is None or state['input_fingerprint'] != input_fingerprint:
+        return None
+    return state
+
+def get_output_fingerprints(config: Dict[str, str], stages: List[str]) -> List[str]:
+    """
+    Read the output fingerprints of upstream stages
+
+    Args:
+        config: Dictionary with database configuration
+        stages: Names of the upstream ETL stages
+
+    Returns:
+        Output fingerprint of each stage, empty string for stages that never ran
+    """
+    states = get_run_states(config, stages)
+    return [states[stage]['output_fingerprint'] if stage in states else '' for stage in stages]
+
+def load_unchanged_mapping(config: Dict[str, str], stage: str, input_fingerprint: str, key_query: str) -> Optional[Dict]:
+    """
+    Return the key mapping of a stage whose input did not change since its last run
+
+    The mapping is read from the local cache when it matches the recorded output
+    fingerprint, otherwise it is rebuilt from the warehouse with key_query.
+
+    Args:
+        config: Dictionary with database configuration
+        stage: Name of the ETL stage
+        input_fingerprint: Fingerprint of the current input of the stage
+        key_query: SQL query returning (original key, surrogate key) rows
+
+    Returns:
+        Key mapping when the stage can be skipped, None when it must run
+    """
+    state = get_unchanged_state(config, stage, input_fingerprint)
+    if state is None:
+        return None
+
+    cache_path = os.path.join(MAPPING_CACHE_DIR, f"{stage}.pkl")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+        if cached['output_fingerprint'] == state['output_fingerprint']:
+            logging.info(f"Stage {stage} unchanged, using cached key mapping")
+            return cached['mapping']
+
+    engine = get_engine(config)
+    try:
+        with engine.connect() as conn:
+            rows = conn.execute(text(key_query)).all()
+    finally:
+        engine.dispose()
+    logging.info(f"Stage {stage} unchanged, loaded key mapping from warehouse")
+    return {key: surrogate_id for key, surrogate_id in rows}
+
+def get_dependent_stages(stage: str) -> List[str]:
+    """
+    List the stages whose tables reference a stage's table, directly or not
+
+    Args:
+        stage: Name of the ETL stage
+
+    Returns:
+        Dependent stages ordered so that every stage comes before the ones it references
+    """
+    ordered = []
+
+    def visit(current: str) -> None:
+        for dependent in STAGE_DEPENDENTS.get(current, []):
+            visit(dependent)
+            if dependent not in ordered:
+                ordered.append(dependent)
+
+    visit(stage)
+    return ordered
+
+def replace_stage_output(
+    config: Dict[str, str],
+    stage: str,
+    input_fingerprint: str,
+    df_save: Union[pd.DataFrame, Mapping[str, np.ndarray]],
+    mapping: Optional[Dict] = None,
+    batch_size: int = 10000
+) -> None:
+    """
+    Replace the rows of a stage's table and record its run state in one transaction
+
+    Surrogate ids are recomputed on every run, so rows referencing the old ids are
+    deleted first and the stages owning them lose their run state, which makes
+    them run again. The key mapping is cached once the transaction is committed.
+
+    Args:
+        config: Dictionary with database configuration
+        stage: Name of the ETL stage, which is also the name of its table
+        input_fingerprint: Fingerprint of the input the stage processed
+        df_save: DataFrame, or column arrays streamed with COPY, to write to the table
+        mapping: Key mapping returned by the stage, if any
+        batch_size: Number of rows per COPY statement for column arrays
+    """
+    output_fingerprint = compute_fingerprint(df_save)
+    dependents = get_dependent_stages(stage)
+
+    engine = get_engine(config)
+    try:
+        with engine.begin() as conn:
+            for table_name in dependents + [stage]:
+                conn.execute(text(f"DELETE FROM {table_name}"))
+            if dependents:
+                conn.execute(
+                    text(f"DELETE FROM {RUN_STATE_TABLE} WHERE stage IN :stages").bindparams(bindparam('stages', expanding=True)),
+                    {'stages': dependents}
+                )
+
+            if isinstance(df_save, pd.DataFrame):
+                df_save.to_sql(name=stage, con=conn, if_exists='append', index=False, method='multi')
+            else:
+                copy_columns(conn, df_save, stage, batch_size)
+
+            conn.execute(
+                text(
+                    f"INSERT INTO {RUN_STATE_TABLE} (stage, input_fingerprint, output_fingerprint, updated_at) "
+                    f"VALUES (:stage, :input_fingerprint, :output_fingerprint, now()) "
+                    f"ON CONFLICT (stage) DO UPDATE SET "
+                    f"input_fingerprint = EXCLUDED.input_fingerprint, "
+                    f"output_fingerprint = EXCLUDED.output_fingerprint, "
+                    f"updated_at = EXCLUDED.updated_at"
+                ),
+                {'stage': stage, 'input_fingerprint': input_fingerprint, 'output_fingerprint': output_fingerprint}
+            )
+    finally:
+        engine.dispose()
+
+    if dependents:
+        logging.info(f"Cleared {', '.join(dependents)} since they reference {stage}")
+    record_count = len(df_save) if isinstance(df_save, pd.DataFrame) else len(next(iter(df_save.values()), []))
+    print(f"Successfully saved {record_count} records to {stage}")
+
+    if mapping is None:
+        return
+
+    os.makedirs(MAPPING_CACHE_DIR, exist_ok=True)
+    with open(os.path.join(MAPPING_CACHE_DIR, f"{stage}.pkl"), 'wb') as f:
+        pickle.dump({'output_fingerprint': output_fingerprint, 'mapping': mapping}, f)
@@ -1,6 +1,30 @@
+import io
+import logging
+import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine
-from typing import Dict
+from sqlalchemy.engine import Connection, Engine
+from typing import Dict, Iterator, List, Mapping, Optional
+
+# Binary COPY signature, flags and header extension length, then the end-of-data marker
+PGCOPY_HEADER = b'PGCOPY\n\xff\r\n\x00' + bytes(8)
+PGCOPY_TRAILER = b'\xff\xff'
+INT4_MIN, INT4_MAX = -2 ** 31, 2 ** 31 - 1
+
+def get_engine(config: Dict[str, str]) -> Engine:
+    """
+    Create a SQLAlchemy engine for the PostgreSQL database
+
+    Args:
+        config: Dictionary with database configuration
+
+    Returns:
+        SQLAlchemy engine connected to the configured database
+    """
+    return create_engine(
+        f"postgresql://{config['user']}:{config['password']}@"
+        f"{config['host']}:{config['port']}/{config['database']}"
+    )
 
 def save_to_postgres(
     df: pd.DataFrame,
@@ -20,10 +44,7 @@ def save_to_postgres(
         index: Whether to write DataFrame index as a column
     """
     try:
-        engine = create_engine(
-            f"postgresql://{config['user']}:{config['password']}@"
-            f"{config['host']}:{config['port']}/{config['database']}"
-        )
+        engine = get_engine(config)
         
         with engine.connect() as conn:
             df.to_sql(
@@ -37,4 +58,181 @@ def save_to_postgres(
         print(f"Successfully saved {len(df)} records to {table_name}")
     except Exception as e:
         print(f"Error saving to PostgreSQL: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+def _binary_type(values: np.ndarray) -> Optional[str]:
+    """Binary COPY type of a column: bool, int4 or float8, None for text"""
+    if values.dtype.kind == 'b':
+        return '?'
+    if values.dtype.kind in 'iu':
+        return '>i4'
+    if values.dtype.kind == 'f':
+        return '>f8'
+    return None
+
+def binary_column_order(columns: Mapping[str, np.ndarray]) -> List[str]:
+    """
+    Order in which serialize_binary_batches writes the fields of a row
+
+    Args:
+        columns: Dictionary mapping column names to equally sized arrays
+
+    Returns:
+        Column names, fixed-width columns first and text columns last
+    """
+    fixed = [name for name, values in columns.items() if _binary_type(values) is not None]
+    return fixed + [name for name in columns if name not in fixed]
+
+def serialize_binary_batches(columns: Mapping[str, np.ndarray], batch_size: int = 10000) -> Iterator[memoryview]:
+    """
+    Serialize column arrays into PostgreSQL binary COPY batches
+
+    Integer arrays are sent as int4, float arrays as float8, bool arrays as bool
+    and any other array as text, in the order given by binary_column_order.
+    Within a batch, rows are grouped by their text values so that every group
+    has a fixed row layout, which is written straight into a reused output
+    buffer from slices of the column arrays: no Python object is created per
+    value and the caller's arrays are never copied. Batches follow the input
+    order; rows inside a batch are written group by group. Setup runs when the
+    function is called, and the output buffer is only valid until the next
+    batch is requested.
+
+    Args:
+        columns: Dictionary mapping column names to equally sized arrays
+        batch_size: Number of rows per batch
+
+    Returns:
+        Iterator over the bytes of each COPY batch
+
+    Raises:
+        ValueError: If an integer column has values outside the int4 range
+    """
+    names = binary_column_order(columns)
+    fixed = [name for name in names if _binary_type(columns[name]) is not None]
+    texts = names[len(fixed):]
+    total_records = len(columns[names[0]]) if names else 0
+    rows_per_batch = min(batch_size, total_records)
+
+    for name in fixed:
+        values = columns[name]
+        if values.dtype.kind in 'iu' and len(values) and (values.min() < INT4_MIN or values.max() > INT4_MAX):
+            raise ValueError(f"Column {name} has values outside the int4 range")
+
+    if texts:
+        # Encode each distinct text once; None/NaN get code -1, which picks the trailing None
+        codes, encoded = [], []
+        for name in texts:
+            text_codes, uniques = pd.factorize(columns[name])
+            codes.append(text_codes)
+            encoded.append([str(value).encode() for value in uniques] + [None])
+        groups, row_group = np.unique(np.stack(codes, axis=1), axis=0, return_inverse=True)
+        row_group = row_group.reshape(-1)
+    else:
+        groups = np.empty((1, 0), dtype=np.intp)
+        row_group = None
+
+    # Packed row layout of each group: fixed-width fields, then the group's text values
+    layouts = []
+    for group in groups:
+        values = [encoded[i][code] for i, code in enumerate(group)]
+        fields = [('field_count', '>i2')]
+        for name in fixed:
+            fields += [(f'{name}_length', '>i4'), (name, _binary_type(columns[name]))]
+        for name, value in zip(texts, values):
+            fields.append((f'{name}_length', '>i4'))
+            if value:
+                fields.append((name, f'S{len(value)}'))
+        layouts.append((np.dtype(fields), values))
+
+    # Batch-sized buffers reused for every batch: output bytes, row order and gathered values
+    max_row_size = max((dtype.itemsize for dtype, _ in layouts), default=0)
+    output = np.empty(len(PGCOPY_HEADER) + max_row_size * rows_per_batch + len(PGCOPY_TRAILER), dtype=np.uint8)
+    output[:len(PGCOPY_HEADER)] = np.frombuffer(PGCOPY_HEADER, dtype=np.uint8)
+    order = np.empty(rows_per_batch, dtype=np.intp)
+    gathered = {dtype: np.empty(rows_per_batch, dtype=dtype) for dtype in {columns[name].dtype for name in fixed}}
+
+    def write_rows(position: int, group: int, start: int, end: int, index: Optional[np.ndarray]) -> int:
+        """Write rows start:end of the input, or the rows at index, in the layout of a group"""
+        dtype, values = layouts[group]
+        count = end - start if index is None else len(index)
+        rows = output[position:position + count * dtype.itemsize].view(dtype)
+        rows['field_count'] = len(names)
+        for name in fixed:
+            column = columns[name]
+            rows[f'{name}_length'] = np.dtype(_binary_type(column)).itemsize
+            if index is None:
+                rows[name] = column[start:end]
+            else:
+                rows[name] = np.take(column, index, out=gathered[column.dtype][:count], mode='clip')
+        for name, value in zip(texts, values):
+            rows[f'{name}_length'] = -1 if value is None else len(value)
+            if value:
+                rows[name] = value
+        return position + count * dtype.itemsize
+
+    def write_batches() -> Iterator[memoryview]:
+        for start in range(0, total_records, batch_size):
+            end = min(start + batch_size, total_records)
+            position = len(PGCOPY_HEADER)
+
+            if row_group is None:
+                position = write_rows(position, 0, start, end, None)
+            else:
+                batch_groups = row_group[start:end]
+                if batch_groups.min() == batch_groups.max():
+                    position = write_rows(position, batch_groups[0], start, end, None)
+                else:
+                    batch_order = order[:end - start]
+                    batch_order[:] = np.argsort(batch_groups, kind='stable')
+                    sorted_groups = batch_groups[batch_order]
+                    batch_order += start
+                    bounds = [0] + (np.flatnonzero(np.diff(sorted_groups)) + 1).tolist() + [end - start]
+                    for run_start, run_end in zip(bounds, bounds[1:]):
+                        index = batch_order[run_start:run_end]
+                        position = write_rows(position, sorted_groups[run_start], start, end, index)
+
+            output[position:position + len(PGCOPY_TRAILER)] = np.frombuffer(PGCOPY_TRAILER, dtype=np.uint8)
+            yield memoryview(output)[:position + len(PGCOPY_TRAILER)]
+
+    return write_batches()
+
+class _MemoryviewReader:
+    """Minimal file-like object over a memoryview, as read by cursor.copy_expert"""
+
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.position = 0
+
+    def read(self, size: int = -1) -> bytes:
+        end = len(self.view) if size < 0 else min(self.position + size, len(self.view))
+        chunk = self.view[self.position:end].tobytes()
+        self.position = end
+        return chunk
+
+def copy_columns(
+    conn: Connection,
+    columns: Mapping[str, np.ndarray],
+    table_name: str,
+    batch_size: int = 10000
+) -> None:
+    """
+    Stream column arrays into a PostgreSQL table with COPY
+
+    Nothing is committed here, so the rows are written as part of the
+    transaction the connection is in.
+
+    Args:
+        conn: SQLAlchemy connection the rows are written through
+        columns: Dictionary mapping column names to equally sized arrays
+        table_name: Target table name
+        batch_size: Number of rows sent per COPY statement
+    """
+    total_records = len(next(iter(columns.values()), []))
+    copy_sql = f"COPY {table_name} ({', '.join(binary_column_order(columns))}) FROM STDIN WITH (FORMAT binary)"
+
+    with conn.connection.cursor() as cursor:
+        for batch_number, batch in enumerate(serialize_binary_batches(columns, batch_size)):
+            cursor.copy_expert(copy_sql, _MemoryviewReader(batch))
+            batch_end = min((batch_number + 1) * batch_size, total_records)
+            progress = (batch_end / total_records) * 100
+            logging.info(f"Progress: {progress:.1f}% ({batch_end}/{total_records} records)")